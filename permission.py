@@ -1,5 +1,11 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+# Параметры AOT-сборки Nuitka (python -m nuitka permission.py):
+# nuitka-project: --onefile
+# nuitka-project: --include-package=typer
+# nuitka-project: --include-package=rich
+# nuitka-project: --include-package=lxml
+# nuitka-project: --output-filename=permission.bin
 """
 permission.py — анализатор разрешений Android (APK/AndroidManifest.xml)
 
@@ -11,22 +17,41 @@ permission.py — анализатор разрешений Android (APK/Android
  - Использует цветной CLI (rich) и удобный интерфейс (typer)
 """
 
+import functools
+import hashlib
+import io
 import json
+import mmap
+import os
+import struct
 import sys
+import xml.etree.ElementTree as ET
 import zipfile
+import zlib
+from dataclasses import dataclass
+from operator import attrgetter
 from pathlib import Path
-from typing import List, Optional, Dict, Any
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Iterable, Iterator, Sequence
 
 import typer
 from rich.console import Console
+from rich.style import Style
 from rich.table import Table
-from lxml import etree
+from rich.text import Text
+
+if TYPE_CHECKING:
+    from lxml import etree
 
 try:
     import apkutils2
 except ImportError:
     apkutils2 = None
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
 app = typer.Typer(help="Android Permission Inspector — анализатор разрешений из APK/Manifest")
 console = Console()
 
@@ -52,63 +77,443 @@ PERMISSION_CATEGORIES = {
     "android.permission.READ_LOGS": ("signature", "SYSTEM"),
 }
 
+_UNKNOWN = ("unknown", None)
+
+# Категории и их числовые id для пакетной классификации (classify_batch)
+CATEGORIES = ("normal", "dangerous", "signature", "unknown")
+_CATEGORY_ID = {c: i for i, c in enumerate(CATEGORIES)}
+
+# Чувствительные разрешения (dangerous/signature) — одна проверка по хэшу
+_SENSITIVE = frozenset(
+    n for n, (c, _) in PERMISSION_CATEGORIES.items() if c in ("dangerous", "signature")
+)
+
+ANDROID_NS = "http://schemas.android.com/apk/res/android"
+_ANDROID_NAME = f"{{{ANDROID_NS}}}name"
+_PERMISSION_TAGS = ("uses-permission", "uses-permission-sdk-23")
+
+# Бинарный AXML начинается с заголовка чанка RES_XML_TYPE (0x0003, размер заголовка 8)
+_AXML_MAGIC = b"\x03\x00\x08\x00"
+
+# Чанки и записи AXML, нужные для извлечения разрешений
+_AXML_CHUNK = struct.Struct("<2HL")
+_AXML_POOL = struct.Struct("<5L")
+_AXML_ELEMENT = struct.Struct("<2L3H")
+_AXML_ATTR = struct.Struct("<3LH2BL")
+_AXML_STRING_POOL = 0x0001
+_AXML_RESOURCE_MAP = 0x0180
+_AXML_START_ELEMENT = 0x0102
+_AXML_END_ELEMENT = 0x0103
+_AXML_UTF8_FLAG = 0x100
+_AXML_TYPE_STRING = 0x03
+_AXML_NO_INDEX = 0xFFFFFFFF
+_ATTR_ANDROID_NAME = 0x01010003
+
+# Стили имени разрешения по категории: создаются один раз, без разбора BBCode на каждую строку
+_DEFAULT_STYLE = Style(color="white")
+_CATEGORY_STYLES = {
+    "dangerous": Style(color="red"),
+    "signature": Style(color="yellow"),
+    "unknown": Style(dim=True),
+    "normal": _DEFAULT_STYLE,
+}
+_SENSITIVE_MARKS = {True: Text("✅"), False: Text("❌")}
+
+
+# ---------------------------------------------------------
+# Модель отчёта
+# ---------------------------------------------------------
+@dataclass(frozen=True)
+class PermRec:
+    """Классифицированное разрешение"""
+    name: str
+    category: str
+    group: Optional[str]
+    sensitive: bool
+
+
+@dataclass
+class Diff:
+    """Разница между двумя наборами разрешений"""
+    added: List[str]
+    removed: List[str]
+    new_dangerous: List[str]
+
+
+@dataclass
+class Report:
+    """JSON-отчёт анализа"""
+    permissions: List[PermRec]
+    diff: Optional[Diff] = None
+
+
+# Версия формата дискового кэша: повышать при любом изменении разбора манифеста
+_CACHE_VERSION = 1
+
+
+# Структуры ZIP: конец центрального каталога, запись каталога, локальный заголовок
+_ZIP_EOCD = struct.Struct("<4s4H2LH")
+_ZIP_CDIR = struct.Struct("<4s6H3L5H2L")
+_ZIP_LOCAL = struct.Struct("<4s5H3L2H")
+_ZIP_EOCD_SIG = b"PK\x05\x06"
+_ZIP_CDIR_SIG = b"PK\x01\x02"
+_ZIP_LOCAL_SIG = b"PK\x03\x04"
+
+# Размер порции для дочитывания каналов в _slurp
+_READ_CHUNK = 1 << 16
+
+
 # ---------------------------------------------------------
 # Вспомогательные функции
 # ---------------------------------------------------------
+def _read_mapped_zip_entry(mm: mmap.mmap, entry: str) -> bytes:
+    """Быстрый путь: только EOCD, каталог до нужного имени и сами данные
+
+    Любое отступление от типичного APK (ZIP64, данные после EOCD, префикс перед
+    архивом) даёт BadZipFile — такие архивы дочитывает zipfile.
+    """
+    target = entry.encode("utf-8")
+    # EOCD лежит в конце файла, за ним — комментарий архива (до 64 КБ);
+    # настоящая запись та, чья длина комментария дотягивается ровно до конца
+    lo = max(0, len(mm) - _ZIP_EOCD.size - 0xFFFF)
+    eocd = mm.rfind(_ZIP_EOCD_SIG, lo)
+    while eocd >= 0:
+        if eocd + _ZIP_EOCD.size <= len(mm):
+            _, _, _, _, count, _, cd_offset, comment_len = _ZIP_EOCD.unpack_from(mm, eocd)
+            if eocd + _ZIP_EOCD.size + comment_len == len(mm):
+                break
+        eocd = mm.rfind(_ZIP_EOCD_SIG, lo, eocd)
+    else:
+        raise zipfile.BadZipFile("не найден конец центрального каталога")
+    if count == 0xFFFF or cd_offset == 0xFFFFFFFF:
+        raise zipfile.BadZipFile("ZIP64")
+
+    pos = cd_offset
+    for _ in range(count):
+        (sig, _, _, flags, method, _, _, crc, csize, _,
+         name_len, extra_len, comment_len, _, _, _, local_offset) = _ZIP_CDIR.unpack_from(mm, pos)
+        if sig != _ZIP_CDIR_SIG:
+            raise zipfile.BadZipFile("повреждён центральный каталог")
+        name_start = pos + _ZIP_CDIR.size
+        if mm[name_start:name_start + name_len] == target:
+            break
+        pos = name_start + name_len + extra_len + comment_len
+    else:
+        raise KeyError(f"{entry} отсутствует в архиве")
+
+    if flags & 0x1:
+        raise zipfile.BadZipFile(f"{entry} зашифрован")
+    sig, *_, name_len, extra_len = _ZIP_LOCAL.unpack_from(mm, local_offset)
+    if sig != _ZIP_LOCAL_SIG:
+        raise zipfile.BadZipFile("повреждён локальный заголовок")
+    start = local_offset + _ZIP_LOCAL.size + name_len + extra_len
+    raw = mm[start:start + csize]
+
+    if method == zipfile.ZIP_STORED:
+        data = raw
+    elif method == zipfile.ZIP_DEFLATED:
+        data = zlib.decompressobj(-zlib.MAX_WBITS).decompress(raw)
+    else:
+        raise zipfile.BadZipFile(f"неподдерживаемый метод сжатия {method}")
+    if zlib.crc32(data) != crc:
+        raise zipfile.BadZipFile(f"неверная CRC32 у {entry}")
+    return data
+
+
+def _read_zip_entry(path: Path, entry: str) -> bytes:
+    """Читает одну запись ZIP через mmap; нестандартные архивы — через zipfile"""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        try:
+            return _read_mapped_zip_entry(mm, entry)
+        except (zipfile.BadZipFile, struct.error):
+            # zipfile терпимее: ищет EOCD с хвостом после него, поправляет смещения
+            # при префиксе перед архивом, понимает ZIP64 и другие методы сжатия
+            with zipfile.ZipFile(f) as zf:
+                return zf.read(entry)
+
+
+def _slurp(path: Path) -> bytes:
+    """Читает файл целиком через os.read, без буферизованной обёртки open()
+
+    Обычный файл читается за один вызов размером из fstat; каналы (FIFO, <(...))
+    и короткие чтения дочитываются до EOF.
+    """
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        chunks = [os.read(fd, os.fstat(fd).st_size or _READ_CHUNK)]
+        while chunks[-1]:
+            chunks.append(os.read(fd, _READ_CHUNK))
+        return b"".join(chunks)
+    finally:
+        os.close(fd)
+
+
+def _same_file(a: Path, b: Path) -> bool:
+    """Указывают ли оба пути на один и тот же файл"""
+    try:
+        return os.path.samefile(a, b)
+    except OSError:
+        return False
+
+
 def load_manifest_from_apk(apk_path: Path) -> Optional[bytes]:
     """Извлекает AndroidManifest.xml из APK"""
     if not apk_path.exists():
         console.print(f"[red]Ошибка: APK-файл {apk_path} не найден[/red]")
         return None
     try:
-        with zipfile.ZipFile(apk_path, "r") as zip_ref:
-            data = zip_ref.read("AndroidManifest.xml")
-            return data
+        return _read_zip_entry(apk_path, "AndroidManifest.xml")
     except Exception as e:
         console.print(f"[red]Ошибка извлечения AndroidManifest.xml: {e}[/red]")
         return None
 
 
-def parse_manifest(data: bytes) -> Optional[etree._ElementTree]:
-    """Парсит XML (возможен бинарный формат AXML через apkutils2)"""
+@functools.lru_cache(maxsize=None)
+def _permission_xpath() -> "etree.XPath":
+    """Компилирует XPath один раз; lxml импортируется только при разборе AXML"""
+    from lxml import etree
+
+    # Обход дерева выполняет libxml2, на выходе сразу строки атрибутов android:name;
+    # как и прежний findall, берём только прямых потомков корня <manifest>
+    return etree.XPath(
+        "/*/*[local-name()='uses-permission' or local-name()='uses-permission-sdk-23']/@android:name",
+        namespaces={"android": ANDROID_NS},
+    )
+
+
+def _iterparse_permissions(data: bytes) -> Iterator[str]:
+    """Потоково отдаёт android:name элементов uses-permission*, не строя полное дерево"""
+    depth = 0
+    for event, elem in ET.iterparse(io.BytesIO(data), events=("start", "end")):
+        if event == "start":
+            depth += 1
+            continue
+        # Учитываются только прямые потомки <manifest> (глубина 2)
+        if depth == 2 and elem.tag in _PERMISSION_TAGS:
+            name = elem.get(_ANDROID_NAME)
+            if name:
+                yield name.strip()
+        depth -= 1
+        # Освобождаем уже обработанные элементы
+        elem.clear()
+
+
+def _axml_strings(data: bytes, offset: int) -> List[str]:
+    """Декодирует пул строк AXML (UTF-8 или UTF-16LE)"""
+    _, header_size, _ = _AXML_CHUNK.unpack_from(data, offset)
+    count, _, flags, strings_start, _ = _AXML_POOL.unpack_from(data, offset + _AXML_CHUNK.size)
+    offsets = struct.unpack_from(f"<{count}L", data, offset + header_size)
+    base = offset + strings_start
+    strings = []
+    for off in offsets:
+        pos = base + off
+        if flags & _AXML_UTF8_FLAG:
+            # Длина в символах, затем в байтах — по 1–2 байта каждая
+            pos += 2 if data[pos] & 0x80 else 1
+            size = data[pos]
+            if size & 0x80:
+                size = ((size & 0x7F) << 8) | data[pos + 1]
+                pos += 1
+            pos += 1
+            strings.append(data[pos:pos + size].decode("utf-8", "replace"))
+        else:
+            (size,) = struct.unpack_from("<H", data, pos)
+            pos += 2
+            if size & 0x8000:
+                size = ((size & 0x7FFF) << 16) | struct.unpack_from("<H", data, pos)[0]
+                pos += 2
+            strings.append(data[pos:pos + 2 * size].decode("utf-16-le", "replace"))
+    return strings
+
+
+def _decode_axml_permissions(data: bytes) -> List[str]:
+    """Извлекает разрешения прямо из бинарного AXML, не восстанавливая XML-дерево"""
+    _, header_size, total = _AXML_CHUNK.unpack_from(data, 0)
+    # Размер из заголовка обязан совпасть с данными: иначе часть разрешений молча потерялась бы
+    if total != len(data):
+        raise ValueError(f"размер AXML в заголовке ({total}) не совпадает с данными ({len(data)})")
+    strings: List[str] = []
+    resource_ids: tuple = ()
+    perm_tags: frozenset = frozenset()
+    names = []
+    depth = 0
+
+    pos = header_size
+    while pos < total:
+        chunk_type, chunk_header, chunk_size = _AXML_CHUNK.unpack_from(data, pos)
+        if chunk_size < _AXML_CHUNK.size or pos + chunk_size > total:
+            raise ValueError("повреждён чанк AXML")
+        if chunk_type == _AXML_STRING_POOL:
+            strings = _axml_strings(data, pos)
+            perm_tags = frozenset(i for i, s in enumerate(strings) if s in _PERMISSION_TAGS)
+        elif chunk_type == _AXML_RESOURCE_MAP:
+            resource_ids = struct.unpack_from(f"<{(chunk_size - chunk_header) // 4}L", data, pos + chunk_header)
+        elif chunk_type == _AXML_START_ELEMENT:
+            depth += 1
+            ext = pos + chunk_header
+            _, tag, attr_start, attr_size, attr_count = _AXML_ELEMENT.unpack_from(data, ext)
+            # Как и для текстового манифеста — только прямые потомки <manifest>
+            if depth == 2 and tag in perm_tags:
+                attr = ext + attr_start
+                for _ in range(attr_count):
+                    attr_ns, attr_name, raw, _, _, value_type, value = _AXML_ATTR.unpack_from(data, attr)
+                    # android:name узнаём по ID ресурса: в обфусцированных APK имя атрибута бывает пустым
+                    if (attr_name < len(resource_ids) and resource_ids[attr_name] == _ATTR_ANDROID_NAME) or (
+                        strings[attr_name] == "name" and attr_ns != _AXML_NO_INDEX and strings[attr_ns] == ANDROID_NS
+                    ):
+                        if raw == _AXML_NO_INDEX and value_type == _AXML_TYPE_STRING:
+                            raw = value
+                        if raw != _AXML_NO_INDEX and strings[raw]:
+                            names.append(strings[raw].strip())
+                        break
+                    attr += attr_size
+        elif chunk_type == _AXML_END_ELEMENT:
+            depth -= 1
+        pos += chunk_size
+    return list(dict.fromkeys(names))
+
+
+def parse_manifest(data: bytes) -> Optional[List[str]]:
+    """Парсит манифест и извлекает разрешения (бинарный AXML; запасной декодер — apkutils2)"""
     try:
-        # Если есть apkutils2, используем его для декодирования бинарного AXML
-        if apkutils2:
-            return etree.fromstring(apkutils2.APK.load_manifest_xml(data))
-        # Иначе — пробуем напрямую
-        return etree.fromstring(data)
+        if data[:4] == _AXML_MAGIC:
+            try:
+                return _decode_axml_permissions(data)
+            except (struct.error, IndexError, ValueError):
+                # Нестандартный AXML — отдаём полному декодеру apkutils2
+                if not apkutils2:
+                    raise
+            from lxml import etree
+
+            # apkutils2 отдаёт уже декодированный текст — строим дерево сразу
+            return extract_permissions(etree.fromstring(apkutils2.APK.load_manifest_xml(data)))
+        # Текстовый XML — потоково, C-ускоренным xml.etree без загрузки lxml
+        return list(dict.fromkeys(_iterparse_permissions(data)))
     except Exception as e:
         console.print(f"[red]Ошибка парсинга манифеста: {e}[/red]")
         return None
 
 
-def extract_permissions(manifest_root: etree._ElementTree) -> List[str]:
+def extract_permissions(manifest_root: "etree._Element") -> List[str]:
     """Извлекает uses-permission / uses-permission-sdk-23"""
-    perms = []
     if manifest_root is None:
-        return perms
-    ns = {"android": "http://schemas.android.com/apk/res/android"}
-    for tag in ["uses-permission", "uses-permission-sdk-23"]:
-        for el in manifest_root.findall(tag):
-            name = el.get("{http://schemas.android.com/apk/res/android}name")
-            if name:
-                perms.append(name.strip())
-    # Уникализируем
-    return sorted(set(perms))
+        return []
+    names = _permission_xpath()(manifest_root)
+    # Уникализируем, сохраняя порядок документа; сортировка — только при выводе
+    return list(dict.fromkeys(n.strip() for n in names if n))
+
+
+@functools.lru_cache(maxsize=None)
+def _cache_dir() -> Optional[Path]:
+    """Каталог дискового кэша; None, если домашний каталог определить нельзя"""
+    base = os.environ.get("XDG_CACHE_HOME")
+    if not base:
+        try:
+            base = Path.home() / ".cache"
+        except (RuntimeError, KeyError):
+            return None
+    return Path(base) / "apk-permission-inspector"
+
+
+def _cache_path(data: bytes) -> Optional[Path]:
+    """Файл кэша для манифеста: версия формата и sha256 его байтов"""
+    cache_dir = _cache_dir()
+    if cache_dir is None:
+        return None
+    return cache_dir / f"v{_CACHE_VERSION}-{hashlib.sha256(data).hexdigest()}.json.zst"
 
 
-def classify_permission(name: str) -> Dict[str, Any]:
-    """Классифицирует разрешение по словарю"""
-    if name in PERMISSION_CATEGORIES:
-        cat, group = PERMISSION_CATEGORIES[name]
-    else:
-        cat, group = ("unknown", None)
-    sensitive = cat in ("dangerous", "signature")
-    return {"name": name, "category": cat, "group": group, "sensitive": sensitive}
+def _read_permission_cache(path: Path) -> Optional[List[str]]:
+    """Читает разрешения из дискового кэша; повреждённая запись считается промахом"""
+    try:
+        names = json.loads(zstandard.ZstdDecompressor().decompress(path.read_bytes()))
+    except (OSError, zstandard.ZstdError, ValueError):
+        return None
+    if not isinstance(names, list) or not all(isinstance(n, str) for n in names):
+        return None
+    return names
 
 
-def print_table(permissions: List[Dict[str, Any]], title: str = "Permissions"):
-    """Вывод таблицы разрешений в консоль"""
+def _write_permission_cache(path: Path, names: List[str]) -> None:
+    """Сохраняет разрешения в дисковый кэш; ошибки записи не мешают анализу"""
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_bytes(zstandard.ZstdCompressor().compress(json.dumps(names, ensure_ascii=False).encode("utf-8")))
+        os.replace(tmp, path)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+
+
+def load_permissions(data: bytes, use_cache: bool = True) -> Optional[List[str]]:
+    """Извлекает разрешения из манифеста, с дисковым кэшем при установленном zstandard
+
+    Ключ кэша — sha256 байтов манифеста и версия формата, поэтому изменённый манифест
+    или новая версия разбора никогда не получают старую запись.
+    """
+    path = _cache_path(data) if zstandard and use_cache and data else None
+    if path is not None:
+        cached = _read_permission_cache(path)
+        if cached is not None:
+            return cached
+    names = parse_manifest(data)
+    if names is not None and path is not None:
+        _write_permission_cache(path, names)
+    return names
+
+
+@functools.lru_cache(maxsize=1024)
+def classify_permission(name: str) -> PermRec:
+    """Классифицирует разрешение по словарю (результат кэшируется и неизменяем)"""
+    cat, group = PERMISSION_CATEGORIES.get(name, _UNKNOWN)
+    return PermRec(name=name, category=cat, group=group, sensitive=name in _SENSITIVE)
+
+
+# Прогреваем кэш известными разрешениями
+for _name in PERMISSION_CATEGORIES:
+    classify_permission(_name)
+
+
+def iter_classified(names: Iterable[str], only: Optional[Iterable[str]] = None) -> Iterator[PermRec]:
+    """Классифицирует и фильтрует разрешения за один проход"""
+    only_set = frozenset(only) if only else None
+    for name in names:
+        rec = classify_permission(name)
+        if only_set is None or rec.category in only_set:
+            yield rec
+
+
+@functools.lru_cache(maxsize=None)
+def _numpy_tables():
+    """Строит таблицы для np.searchsorted один раз; NumPy импортируется только здесь"""
+    try:
+        import numpy as np
+    except ImportError:
+        return None
+    # Отсортированный словарь и параллельный массив id категорий
+    known_names = np.array(sorted(PERMISSION_CATEGORIES))
+    known_cat = np.array([_CATEGORY_ID[PERMISSION_CATEGORIES[n][0]] for n in known_names], dtype=np.int8)
+    return np, known_names, known_cat
+
+
+def classify_batch(names: Sequence[str]) -> List[int]:
+    """Классифицирует пакет разрешений одним вызовом NumPy; возвращает id категорий из CATEGORIES
+
+    Предназначен для массового анализа многих APK; без NumPy работает поэлементно.
+    """
+    tables = _numpy_tables()
+    if tables is None:
+        return [_CATEGORY_ID[classify_permission(n).category] for n in names]
+    np, known_names, known_cat = tables
+    arr = np.asarray(names, dtype=str)
+    idx = np.searchsorted(known_names, arr)
+    clipped = idx.clip(max=len(known_names) - 1)
+    hit = (idx < len(known_names)) & (known_names[clipped] == arr)
+    return np.where(hit, known_cat[clipped], _CATEGORY_ID["unknown"]).tolist()
+
+
+def print_table(permissions: List[PermRec], title: str = "Permissions"):
+    """Вывод таблицы разрешений в консоль (список уже отсортирован по имени)"""
     table = Table(title=title)
     table.add_column("Permission", style="cyan", no_wrap=True)
     table.add_column("Category", style="magenta")
@@ -116,37 +521,61 @@ def print_table(permissions: List[Dict[str, Any]], title: str = "Permissions"):
     table.add_column("Sensitive", style="yellow")
 
     for p in permissions:
-        color = {
-            "dangerous": "red",
-            "signature": "yellow",
-            "unknown": "dim",
-            "normal": "white"
-        }.get(p["category"], "white")
         table.add_row(
-            f"[{color}]{p['name']}[/{color}]",
-            p["category"],
-            p["group"] or "",
-            "✅" if p["sensitive"] else "❌"
+            Text(p.name, style=_CATEGORY_STYLES.get(p.category, _DEFAULT_STYLE)),
+            Text(p.category),
+            Text(p.group or ""),
+            _SENSITIVE_MARKS[p.sensitive],
         )
 
     console.print(table)
 
 
-def diff_permissions(old: List[Dict[str, Any]], new: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+def diff_permissions(old: List[PermRec], new: List[PermRec]) -> Diff:
     """Сравнивает два списка разрешений"""
-    old_names = {p["name"]: p for p in old}
-    new_names = {p["name"]: p for p in new}
-    added = [n for n in new_names if n not in old_names]
-    removed = [n for n in old_names if n not in new_names]
-    new_dangerous = [n for n in added if new_names[n]["category"] == "dangerous"]
-    return {"added": added, "removed": removed, "newDangerous": new_dangerous}
+    old_set = {p.name for p in old}
+    new_map = {p.name: p for p in new}
+    new_set = new_map.keys()
+    added = new_set - old_set
+    removed = old_set - new_set
+    new_dangerous = [n for n in added if new_map[n].category == "dangerous"]
+    return Diff(added=sorted(added), removed=sorted(removed), new_dangerous=sorted(new_dangerous))
+
+
+@functools.lru_cache(maxsize=None)
+def _msgspec():
+    """Возвращает msgspec или None; импорт — только при экспорте JSON"""
+    try:
+        import msgspec
+    except ImportError:
+        return None
+    return msgspec
+
+
+def _report_payload(report: Report) -> Dict[str, Any]:
+    """Собирает отчёт по JSON-схеме: PermRec кодируются как есть, у Diff переименовывается ключ"""
+    diff = report.diff
+    return {
+        "permissions": report.permissions,
+        "diff": None if diff is None else {
+            "added": diff.added,
+            "removed": diff.removed,
+            "newDangerous": diff.new_dangerous,
+        },
+    }
 
 
-def export_json(data: Dict[str, Any], path: Path):
+def export_json(data: Report, path: Path):
     """Сохраняет отчёт в JSON"""
     try:
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        payload = _report_payload(data)
+        # msgspec — быстрый C-кодировщик, dataclass кодирует сам; без него — стандартный json
+        msgspec = _msgspec()
+        if msgspec:
+            path.write_bytes(msgspec.json.format(msgspec.json.encode(payload), indent=2))
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False, indent=2, default=vars)
         console.print(f"[green]JSON-отчёт сохранён: {path}[/green]")
     except Exception as e:
         console.print(f"[red]Ошибка записи JSON: {e}[/red]")
@@ -164,7 +593,8 @@ def analyze(
     output: Optional[Path] = typer.Option(None, "--output", "-o", help="Путь для JSON-отчёта"),
     only: Optional[List[str]] = typer.Option(None, "--only", help="Фильтр по категориям: normal, dangerous, signature, unknown"),
     fail_on_new_dangerous: bool = typer.Option(False, "--fail-on-new-dangerous", help="Завершить с кодом 3, если появились новые dangerous"),
-    no_color: bool = typer.Option(False, "--no-color", help="Отключить цвета")
+    no_color: bool = typer.Option(False, "--no-color", help="Отключить цвета"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Не использовать дисковый кэш разрешений")
 ):
     """Основная команда анализа"""
     if no_color:
@@ -175,49 +605,55 @@ def analyze(
     if apk:
         data1 = load_manifest_from_apk(apk)
     elif manifest:
-        data1 = Path(manifest).read_bytes()
+        data1 = _slurp(manifest)
     else:
         console.print("[red]Ошибка: укажите --apk или --manifest[/red]")
         raise typer.Exit(code=1)
 
-    manifest1 = parse_manifest(data1)
-    if manifest1 is None:
+    names1 = load_permissions(data1, use_cache=not no_cache)
+    if names1 is None:
         raise typer.Exit(code=1)
 
-    perms1 = [classify_permission(p) for p in extract_permissions(manifest1)]
-    if only:
-        perms1 = [p for p in perms1 if p["category"] in only]
+    # Сортируем один раз: тот же список идёт и в таблицу, и в отчёт
+    perms1 = sorted(iter_classified(names1, only), key=attrgetter("name"))
 
     print_table(perms1, "Permissions (Base)")
 
-    report = {
-        "permissions": perms1,
-        "diff": None,
-    }
+    report = Report(permissions=perms1)
 
     # Сравнение двух APK/манифестов
     if compare_apk or compare_manifest:
         data2 = None
         if compare_apk:
-            data2 = load_manifest_from_apk(compare_apk)
+            if apk and _same_file(apk, compare_apk):
+                data2 = data1
+            else:
+                data2 = load_manifest_from_apk(compare_apk)
         elif compare_manifest:
-            data2 = Path(compare_manifest).read_bytes()
-        manifest2 = parse_manifest(data2)
-        perms2 = [classify_permission(p) for p in extract_permissions(manifest2)]
-        d = diff_permissions(perms1, perms2)
-        report["diff"] = d
+            data2 = _slurp(compare_manifest)
+        if data2 == data1:
+            # Манифесты совпадают байт в байт — второй не разбираем
+            d = Diff(added=[], removed=[], new_dangerous=[])
+        else:
+            names2 = load_permissions(data2, use_cache=not no_cache)
+            if names2 is None:
+                # Непрочитанный второй манифест не должен выглядеть как «новых разрешений нет»
+                raise typer.Exit(code=1)
+            # --only влияет только на таблицу и отчёт: сравниваем полные списки
+            d = diff_permissions(list(iter_classified(names1)), list(iter_classified(names2)))
+        report.diff = d
 
         # Выводим результаты сравнения
-        if d["added"] or d["removed"]:
+        if d.added or d.removed:
             console.print("\n[bold cyan]Сравнение версий:[/bold cyan]")
-            if d["added"]:
-                console.print(f"[green]+ Добавлены:[/green] {', '.join(d['added'])}")
-            if d["removed"]:
-                console.print(f"[red]- Удалены:[/red] {', '.join(d['removed'])}")
-            if d["newDangerous"]:
-                console.print(f"[red bold]! Новые опасные:[/red bold] {', '.join(d['newDangerous'])}")
-
-        if fail_on_new_dangerous and d["newDangerous"]:
+            if d.added:
+                console.print(f"[green]+ Добавлены:[/green] {', '.join(d.added)}")
+            if d.removed:
+                console.print(f"[red]- Удалены:[/red] {', '.join(d.removed)}")
+            if d.new_dangerous:
+                console.print(f"[red bold]! Новые опасные:[/red bold] {', '.join(d.new_dangerous)}")
+
+        if fail_on_new_dangerous and d.new_dangerous:
             console.print("[red]Найдены новые dangerous разрешения![/red]")
             if output:
                 export_json(report, output)
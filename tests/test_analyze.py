@@ -0,0 +1,63 @@
+"""Сравнение двух APK через CLI"""
+
+import shutil
+import struct
+import zipfile
+import zlib
+
+import pytest
+from typer.testing import CliRunner
+
+from permission import app
+
+BASE = b"""<manifest xmlns:android="http://schemas.android.com/apk/res/android">
+    <uses-permission android:name="android.permission.INTERNET"/>
+</manifest>"""
+EVIL = BASE.replace(b"</manifest>", b'<uses-permission android:name="android.permission.SEND_SMS"/></manifest>')
+
+runner = CliRunner()
+
+
+def _apk(path, manifest):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("AndroidManifest.xml", manifest)
+    return path
+
+
+def _compare(base, other, *args):
+    result = runner.invoke(app, ["--apk", str(base), "--compare-apk", str(other), "--fail-on-new-dangerous", "--no-cache", *args])
+    return result.exit_code
+
+
+@pytest.fixture
+def base_apk(tmp_path):
+    return _apk(tmp_path / "base.apk", BASE)
+
+
+def test_new_dangerous(base_apk, tmp_path):
+    assert _compare(base_apk, _apk(tmp_path / "new.apk", EVIL)) == 3
+
+
+def test_same_file(base_apk):
+    assert _compare(base_apk, base_apk) == 0
+
+
+def test_identical_copy(base_apk, tmp_path):
+    assert _compare(base_apk, shutil.copy(base_apk, tmp_path / "copy.apk")) == 0
+
+
+def test_spoofed_crc_is_not_trusted(base_apk, tmp_path):
+    # CRC32 манифеста базового APK вписана в APK с новыми разрешениями
+    spoof = _apk(tmp_path / "spoof.apk", EVIL)
+    data = bytearray(spoof.read_bytes())
+    for sig, offset in ((b"PK\x03\x04", 14), (b"PK\x01\x02", 16)):
+        struct.pack_into("<L", data, data.find(sig) + offset, zlib.crc32(BASE))
+    spoof.write_bytes(bytes(data))
+    assert _compare(base_apk, spoof) != 0
+
+
+def test_only_does_not_affect_diff(tmp_path):
+    # Те же разрешения в перекодированном манифесте: фильтр не должен порождать «новые» dangerous
+    base = _apk(tmp_path / "base.apk", EVIL)
+    other = _apk(tmp_path / "other.apk", EVIL.replace(b"\n    ", b"\n\t"))
+    assert _compare(base, other, "--only", "normal") == 0
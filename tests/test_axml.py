@@ -0,0 +1,129 @@
+"""Разбор бинарного AXML собственным декодером"""
+
+import struct
+
+import pytest
+
+import permission
+from permission import ANDROID_NS, _decode_axml_permissions, parse_manifest
+
+NO_INDEX = 0xFFFFFFFF
+PERMISSIONS = [
+    "android.permission.INTERNET",
+    "android.permission.CAMERA",
+    " com.example.CUSTOM ",
+    "android.permission.CAMERA",
+]
+NESTED = "android.permission.NESTED"
+EXPECTED = ["android.permission.INTERNET", "android.permission.CAMERA", "com.example.CUSTOM", "android.permission.READ_SMS"]
+
+
+def _chunk(chunk_type, header_size, body):
+    return struct.pack("<2HL", chunk_type, header_size, 8 + len(body)) + body
+
+
+def _string_pool(strings, utf8):
+    offsets, body = [], b""
+    for s in strings:
+        offsets.append(len(body))
+        if utf8:
+            raw = s.encode("utf-8")
+            length = lambda n: bytes([n]) if n < 0x80 else bytes([0x80 | (n >> 8), n & 0xFF])  # noqa: E731
+            body += length(len(s)) + length(len(raw)) + raw + b"\x00"
+        else:
+            body += struct.pack("<H", len(s)) + s.encode("utf-16-le") + b"\x00\x00"
+    body += b"\x00" * (-len(body) % 4)
+    header = struct.pack("<5L", len(strings), 0, 0x100 if utf8 else 0, 28 + 4 * len(strings), 0)
+    return _chunk(0x0001, 28, header + struct.pack(f"<{len(strings)}L", *offsets) + body)
+
+
+def build_axml(permissions=PERMISSIONS, utf8=False, obfuscated=False):
+    """Собирает минимальный AXML: manifest с uses-permission* и application"""
+    strings = ["" if obfuscated else "name", "label", "android", ANDROID_NS, "manifest",
+               "uses-permission", "uses-permission-sdk-23", "application", "package", "x.y"]
+    strings += permissions + ["android.permission.READ_SMS", NESTED]
+    idx = {s: i for i, s in enumerate(strings)}
+
+    def start(tag, attrs):
+        body = struct.pack("<2L3H3H", NO_INDEX, idx[tag], 20, 20, len(attrs), 0, 0, 0)
+        for ns, name, value in attrs:
+            body += struct.pack("<3LH2BL", ns, name, value, 8, 0, 0x03, value)
+        return _chunk(0x0102, 16, struct.pack("<2L", 1, NO_INDEX) + body)
+
+    def end(tag):
+        return _chunk(0x0103, 16, struct.pack("<4L", 1, NO_INDEX, NO_INDEX, idx[tag]))
+
+    chunks = [
+        _string_pool(strings, utf8),
+        _chunk(0x0180, 8, struct.pack("<2L", 0x01010003, 0x01010001)),
+        _chunk(0x0100, 16, struct.pack("<4L", 1, NO_INDEX, idx["android"], idx[ANDROID_NS])),
+        start("manifest", [(NO_INDEX, idx["package"], idx["x.y"])]),
+    ]
+    for i, perm in enumerate(permissions):
+        chunks.append(start("uses-permission", [(idx[ANDROID_NS], idx["label"], idx["x.y"]),
+                                                (idx[ANDROID_NS], 0, 10 + i)]))
+        chunks.append(end("uses-permission"))
+    chunks.append(start("uses-permission-sdk-23", [(idx[ANDROID_NS], 0, idx["android.permission.READ_SMS"])]))
+    chunks.append(end("uses-permission-sdk-23"))
+    chunks.append(start("application", [(idx[ANDROID_NS], 0, idx["x.y"])]))
+    # Вложенный uses-permission не объявляет разрешение приложения
+    chunks.append(start("uses-permission", [(idx[ANDROID_NS], 0, idx[NESTED])]))
+    chunks += [end("uses-permission"), end("application"), end("manifest")]
+    return _chunk(0x0003, 8, b"".join(chunks))
+
+
+@pytest.mark.parametrize("utf8", [False, True], ids=["utf16", "utf8"])
+def test_decodes_permissions(utf8):
+    assert _decode_axml_permissions(build_axml(utf8=utf8)) == EXPECTED
+
+
+def test_obfuscated_attribute_name():
+    # Имя атрибута пустое — android:name узнаётся по ID ресурса
+    assert _decode_axml_permissions(build_axml(obfuscated=True)) == EXPECTED
+
+
+@pytest.mark.parametrize("utf8", [False, True], ids=["utf16", "utf8"])
+def test_long_strings(utf8):
+    long_name = "com.example." + "Я" * 300
+    assert _decode_axml_permissions(build_axml([long_name], utf8=utf8)) == [long_name, "android.permission.READ_SMS"]
+
+
+def test_parse_manifest_uses_decoder():
+    assert parse_manifest(build_axml()) == EXPECTED
+
+
+def test_text_manifest_ignores_nested():
+    # Текстовый манифест разбирается по тем же правилам: только прямые потомки <manifest>
+    xml = f"""<manifest xmlns:android="{ANDROID_NS}">
+        <uses-permission android:name="android.permission.INTERNET"/>
+        <application><uses-permission android:name="{NESTED}"/></application>
+        <uses-permission-sdk-23 android:name="android.permission.READ_SMS"/>
+    </manifest>"""
+    assert parse_manifest(xml.encode()) == ["android.permission.INTERNET", "android.permission.READ_SMS"]
+
+
+@pytest.mark.parametrize("cut", [12, 200, -30])
+def test_truncated(cut):
+    with pytest.raises((ValueError, struct.error)):
+        _decode_axml_permissions(build_axml()[:cut])
+
+
+@pytest.mark.parametrize("delta", [-40, 40])
+def test_forged_total_size(delta):
+    data = bytearray(build_axml())
+    struct.pack_into("<L", data, 4, len(data) + delta)
+    with pytest.raises(ValueError):
+        _decode_axml_permissions(bytes(data))
+
+
+def test_corrupted_chunk_size():
+    data = bytearray(build_axml())
+    # Размер пула строк больше всего файла
+    struct.pack_into("<L", data, 12, 0x7FFFFFFF)
+    with pytest.raises(ValueError):
+        _decode_axml_permissions(bytes(data))
+
+
+def test_parse_manifest_reports_broken_axml(monkeypatch):
+    monkeypatch.setattr(permission, "apkutils2", None)
+    assert parse_manifest(build_axml()[:200]) is None
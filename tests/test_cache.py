@@ -0,0 +1,68 @@
+"""Дисковый кэш разобранных манифестов"""
+
+from pathlib import Path
+
+import pytest
+
+import permission
+
+pytest.importorskip("zstandard")
+
+MANIFEST = b"""<manifest xmlns:android="http://schemas.android.com/apk/res/android">
+    <uses-permission android:name="android.permission.CAMERA"/>
+    <uses-permission android:name="android.permission.INTERNET"/>
+</manifest>"""
+EXPECTED = ["android.permission.CAMERA", "android.permission.INTERNET"]
+
+
+@pytest.fixture
+def cache_home(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    permission._cache_dir.cache_clear()
+    yield tmp_path / "apk-permission-inspector"
+    permission._cache_dir.cache_clear()
+
+
+def _forbid_parse(monkeypatch):
+    def fail(data):
+        raise AssertionError("манифест не должен разбираться повторно")
+    monkeypatch.setattr(permission, "parse_manifest", fail)
+
+
+def test_hit_skips_parsing(cache_home, monkeypatch):
+    assert permission.load_permissions(MANIFEST) == EXPECTED
+    assert len(list(cache_home.iterdir())) == 1
+    _forbid_parse(monkeypatch)
+    assert permission.load_permissions(MANIFEST) == EXPECTED
+
+
+def test_key_includes_version(cache_home, monkeypatch):
+    permission.load_permissions(MANIFEST)
+    monkeypatch.setattr(permission, "_CACHE_VERSION", permission._CACHE_VERSION + 1)
+    assert permission._cache_path(MANIFEST).exists() is False
+
+
+def test_no_cache(cache_home):
+    assert permission.load_permissions(MANIFEST, use_cache=False) == EXPECTED
+    assert not cache_home.exists()
+
+
+def test_corrupt_entry_is_a_miss(cache_home):
+    path = permission._cache_path(MANIFEST)
+    path.parent.mkdir(parents=True)
+    path.write_bytes(b"garbage")
+    assert permission.load_permissions(MANIFEST) == EXPECTED
+
+
+def test_unknown_home_disables_cache(monkeypatch):
+    monkeypatch.delenv("XDG_CACHE_HOME", raising=False)
+
+    def no_home():
+        raise RuntimeError("Could not determine home directory.")
+    monkeypatch.setattr(Path, "home", no_home)
+    permission._cache_dir.cache_clear()
+    try:
+        assert permission._cache_path(MANIFEST) is None
+        assert permission.load_permissions(MANIFEST) == EXPECTED
+    finally:
+        permission._cache_dir.cache_clear()
@@ -0,0 +1,33 @@
+"""Классификация разрешений: поштучная и пакетная"""
+
+import sys
+
+import pytest
+
+import permission
+from permission import CATEGORIES, PERMISSION_CATEGORIES, classify_batch, classify_permission
+
+NAMES = sorted(PERMISSION_CATEGORIES) + ["com.example.CUSTOM", "android.permission.CAMERA2", "", "a"]
+
+
+def _expected(names):
+    return [CATEGORIES.index(classify_permission(n).category) for n in names]
+
+
+@pytest.fixture(params=["numpy", "fallback"])
+def batch_backend(request, monkeypatch):
+    permission._numpy_tables.cache_clear()
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setitem(sys.modules, "numpy", None)
+    yield
+    permission._numpy_tables.cache_clear()
+
+
+def test_classify_batch_matches_classify_permission(batch_backend):
+    assert classify_batch(NAMES) == _expected(NAMES)
+
+
+def test_classify_batch_empty(batch_backend):
+    assert classify_batch([]) == []
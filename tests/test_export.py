@@ -0,0 +1,40 @@
+"""Экспорт JSON-отчёта с msgspec и без него"""
+
+import json
+
+import pytest
+
+import permission
+from permission import Diff, Report, classify_permission, export_json
+
+REPORT = Report(
+    permissions=[classify_permission("android.permission.CAMERA"), classify_permission("com.example.Я")],
+    diff=Diff(added=["android.permission.SEND_SMS"], removed=[], new_dangerous=["android.permission.SEND_SMS"]),
+)
+EXPECTED = {
+    "permissions": [
+        {"name": "android.permission.CAMERA", "category": "dangerous", "group": "CAMERA", "sensitive": True},
+        {"name": "com.example.Я", "category": "unknown", "group": None, "sensitive": False},
+    ],
+    "diff": {
+        "added": ["android.permission.SEND_SMS"],
+        "removed": [],
+        "newDangerous": ["android.permission.SEND_SMS"],
+    },
+}
+
+
+@pytest.fixture(params=["msgspec", "json"])
+def encoder(request, monkeypatch):
+    if request.param == "msgspec":
+        pytest.importorskip("msgspec")
+    else:
+        monkeypatch.setattr(permission, "_msgspec", lambda: None)
+
+
+def test_export_json(encoder, tmp_path):
+    path = tmp_path / "report.json"
+    export_json(REPORT, path)
+    text = path.read_text(encoding="utf-8")
+    assert json.loads(text) == EXPECTED
+    assert "com.example.Я" in text
@@ -0,0 +1,108 @@
+"""Сверка _read_zip_entry со стандартным zipfile"""
+
+import struct
+import zipfile
+import zlib
+
+import pytest
+
+from permission import _read_zip_entry
+
+MANIFEST = "AndroidManifest.xml"
+PAYLOAD = b'<?xml version="1.0"?><manifest>' + b"<uses-permission/>" * 200 + b"</manifest>"
+
+
+def _make_apk(path, compression=zipfile.ZIP_DEFLATED, comment=b"", payload=PAYLOAD):
+    with zipfile.ZipFile(path, "w", compression) as zf:
+        zf.writestr("classes.dex", b"\x00" * 512)
+        zf.writestr(MANIFEST, payload)
+        zf.writestr("res/layout/main.xml", b"<LinearLayout/>")
+        zf.comment = comment
+    return path
+
+
+def _expected(path):
+    with zipfile.ZipFile(path) as zf:
+        return zf.read(MANIFEST)
+
+
+@pytest.mark.parametrize("compression", [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED])
+def test_matches_zipfile(tmp_path, compression):
+    apk = _make_apk(tmp_path / "app.apk", compression)
+    assert _read_zip_entry(apk, MANIFEST) == _expected(apk)
+
+
+def test_archive_comment(tmp_path):
+    apk = _make_apk(tmp_path / "app.apk", comment=b"built by ci" * 100)
+    assert _read_zip_entry(apk, MANIFEST) == _expected(apk)
+
+
+def test_archive_comment_with_fake_eocd(tmp_path):
+    # zipfile здесь сам сдаётся, поэтому сверяем с исходными данными
+    apk = _make_apk(tmp_path / "app.apk", comment=b"PK\x05\x06" + b"x" * 40)
+    assert _read_zip_entry(apk, MANIFEST) == PAYLOAD
+
+
+def test_zip64_entry(tmp_path):
+    apk = tmp_path / "app.apk"
+    with zipfile.ZipFile(apk, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("classes.dex", b"\x00" * 512)
+        with zf.open(MANIFEST, "w", force_zip64=True) as f:
+            f.write(PAYLOAD)
+    assert _read_zip_entry(apk, MANIFEST) == _expected(apk)
+
+
+def test_zip64_directory(tmp_path):
+    # Больше 0xFFFF записей — в EOCD лежит маркер ZIP64
+    apk = tmp_path / "app.apk"
+    with zipfile.ZipFile(apk, "w") as zf:
+        for i in range(0x10000):
+            zf.writestr(f"r/{i}", b"")
+        zf.writestr(MANIFEST, PAYLOAD)
+    assert _read_zip_entry(apk, MANIFEST) == _expected(apk)
+
+
+def test_trailing_data_after_eocd(tmp_path):
+    apk = _make_apk(tmp_path / "app.apk")
+    with open(apk, "ab") as f:
+        f.write(b"\x00" * 16)
+    assert _read_zip_entry(apk, MANIFEST) == _expected(apk)
+
+
+def test_stub_before_archive(tmp_path):
+    # Префикс (например, загрузчик) сдвигает все смещения каталога
+    src = _make_apk(tmp_path / "src.apk")
+    apk = tmp_path / "app.apk"
+    apk.write_bytes(b"#!/bin/sh\nexit 0\n" + b"\x00" * 100 + src.read_bytes())
+    assert _read_zip_entry(apk, MANIFEST) == _expected(apk) == PAYLOAD
+
+
+def test_missing_entry(tmp_path):
+    apk = tmp_path / "app.apk"
+    with zipfile.ZipFile(apk, "w") as zf:
+        zf.writestr("classes.dex", b"")
+    with pytest.raises(KeyError):
+        _read_zip_entry(apk, MANIFEST)
+
+
+def test_not_a_zip(tmp_path):
+    apk = tmp_path / "app.apk"
+    apk.write_bytes(b"not a zip at all")
+    with pytest.raises(zipfile.BadZipFile):
+        _read_zip_entry(apk, MANIFEST)
+
+
+def test_crc_mismatch(tmp_path):
+    apk = _make_apk(tmp_path / "app.apk")
+    data = bytearray(apk.read_bytes())
+    # Подменяем CRC32 записи манифеста в центральном каталоге
+    entry = data.rfind(b"PK\x01\x02", 0, data.rfind(MANIFEST.encode()))
+    struct.pack_into("<L", data, entry + 16, zlib.crc32(b"forged"))
+    apk.write_bytes(bytes(data))
+    with pytest.raises(zipfile.BadZipFile):
+        _read_zip_entry(apk, MANIFEST)
+
+
+def test_other_method_via_zipfile(tmp_path):
+    apk = _make_apk(tmp_path / "app.apk", zipfile.ZIP_BZIP2)
+    assert _read_zip_entry(apk, MANIFEST) == _expected(apk)
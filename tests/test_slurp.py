@@ -0,0 +1,29 @@
+"""Чтение файла манифеста через _slurp"""
+
+import os
+import threading
+
+import pytest
+
+from permission import _slurp
+
+DATA = b"<manifest/>" * 20000
+
+
+def test_regular_file(tmp_path):
+    path = tmp_path / "AndroidManifest.xml"
+    path.write_bytes(DATA)
+    assert _slurp(path) == DATA
+
+
+@pytest.mark.skipif(not hasattr(os, "mkfifo"), reason="нет именованных каналов")
+def test_fifo(tmp_path):
+    # У канала st_size == 0, а данные приходят порциями
+    path = tmp_path / "manifest.fifo"
+    os.mkfifo(path)
+    writer = threading.Thread(target=path.write_bytes, args=(DATA,))
+    writer.start()
+    try:
+        assert _slurp(path) == DATA
+    finally:
+        writer.join()